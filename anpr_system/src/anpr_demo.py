@@ -7,7 +7,10 @@ It allows testing the license plate recognition with example images.
 
 import os
 import sys
+import itertools
+import queue
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 from uk_plate_recognizer import UKPlateRecognizer
 
@@ -25,16 +28,20 @@ def process_single_image(image_path, recognizer, show_image=False):
         print(f"Error: Image file not found: {image_path}")
         return False
     
-    print(f"\nProcessing image: {image_path}")
-    
     # Read the image
     image = cv2.imread(image_path)
+    return process_loaded_image(image_path, image, recognizer, show_image)
+
+def process_loaded_image(image_path, image, recognizer, show_image=False):
+    """Process an already decoded image and show the results."""
+    print(f"\nProcessing image: {image_path}")
+    
     if image is None:
         print(f"Error: Could not read image: {image_path}")
         return False
     
     # Process the image
-    results = recognizer.process_image(image_path)
+    results = recognizer.process_image_array(image)
     
     # Display results
     print("\nRecognition Results:")
@@ -86,12 +93,36 @@ def process_directory(directory_path, recognizer, show_image=False):
     
     print(f"Found {len(image_files)} image files.")
     
+    # Decode images on background threads while the main thread runs recognition.
+    # At most `prefetch` loads are in flight (queued or decoding), so decoded images
+    # stay bounded and a loader never blocks on put() if recognition stops early.
+    image_paths = iter([os.path.join(directory_path, f) for f in image_files])
+    prefetch = 8
+    loaded = queue.Queue(maxsize=prefetch)
+    
+    def load_image(image_path):
+        image = None
+        try:
+            image = cv2.imread(image_path)
+        finally:
+            loaded.put((image_path, image))
+    
     success_count = 0
-    for image_file in image_files:
-        image_path = os.path.join(directory_path, image_file)
-        success = process_single_image(image_path, recognizer, show_image)
-        if success:
-            success_count += 1
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for image_path in itertools.islice(image_paths, prefetch):
+            pool.submit(load_image, image_path)
+        
+        for _ in range(len(image_files)):
+            image_path, image = loaded.get()
+            
+            # Keep the pipeline full: one new load for each image taken off the queue
+            next_path = next(image_paths, None)
+            if next_path is not None:
+                pool.submit(load_image, next_path)
+            
+            success = process_loaded_image(image_path, image, recognizer, show_image)
+            if success:
+                success_count += 1
     
     print(f"\nSummary: Successfully processed {success_count} out of {len(image_files)} images.")
 
@@ -100,7 +131,7 @@ def main():
     args = parse_arguments()
     
     # Initialize the recognizer
-    recognizer = UKPlateRecognizer()
+    recognizer = UKPlateRecognizer(debug=args.show)
     
     # Check if we have either an image or a directory
     if args.image:
@@ -1,13 +1,32 @@
+import os
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+# Firestore allows up to 500 writes per batch; smaller slices commit in parallel
+BATCH_SIZE = 50
 
 class FirebaseHandler:
     """
     A class for handling Firebase operations related to ANPR system.
+    One handler is shared per service account file, so the credentials are parsed
+    and the Firestore client is created only once per process.
     """
     
+    _instances: Dict[str, 'FirebaseHandler'] = {}
+    
+    def __new__(cls, service_account_path: str):
+        key = os.path.abspath(service_account_path)
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._initialized = False
+            cls._instances[key] = instance
+        return instance
+    
     def __init__(self, service_account_path: str):
         """
         Initialize Firebase handler with service account credentials.
@@ -15,9 +34,20 @@ class FirebaseHandler:
         Args:
             service_account_path (str): Path to the Firebase service account key file
         """
-        cred = credentials.Certificate(service_account_path)
-        firebase_admin.initialize_app(cred)
-        self.db = firestore.client()
+        if self._initialized:
+            return
+        
+        # Use a named app per credentials file so several service accounts can coexist
+        app_name = os.path.abspath(service_account_path)
+        try:
+            app = firebase_admin.get_app(app_name)
+        except ValueError:
+            cred = credentials.Certificate(service_account_path)
+            app = firebase_admin.initialize_app(cred, name=app_name)
+        
+        self.db = firestore.client(app=app)
+        self._pool = ThreadPoolExecutor(max_workers=40)
+        self._initialized = True
         
     def save_plate_recognition(self, 
                              plate_number: str, 
@@ -51,6 +81,42 @@ class FirebaseHandler:
         
         return doc_ref.id
         
+    def save_plate_recognition_batch(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save several plate recognition results using batched, parallel commits.
+        
+        Args:
+            records (List[Dict[str, Any]]): Records with 'plate_number', 'image_path'
+                and optionally 'location'
+            
+        Returns:
+            List[str]: Document IDs of the saved records, in input order
+        """
+        collection = self.db.collection('plate_recognition')
+        doc_ids = []
+        futures = []
+        
+        for start in range(0, len(records), BATCH_SIZE):
+            batch = self.db.batch()
+            for record in records[start:start + BATCH_SIZE]:
+                doc_ref = collection.document()
+                batch.set(doc_ref, {
+                    'plate_number': record['plate_number'],
+                    'image_path': record['image_path'],
+                    'location': record.get('location'),
+                    'timestamp': datetime.now(),
+                    'status': 'active'
+                })
+                doc_ids.append(doc_ref.id)
+            
+            futures.append(self._pool.submit(batch.commit, retry=Retry()))
+        
+        # Surface any commit failure to the caller
+        for future in futures:
+            future.result()
+        
+        return doc_ids
+        
     def get_plate_recognition(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve plate recognition record from Firebase.
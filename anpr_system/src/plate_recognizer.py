@@ -1,11 +1,16 @@
 import cv2
 import numpy as np
 import pytesseract
-from PIL import Image
-import imutils
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
+from tess_backend import PyTessBaseAPI, PSM, OEM
+from uk_plate_utils import strip_non_alnum
+
+# Characters that can appear on a UK plate
+OCR_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
 
 class PlateRecognizer:
     """
@@ -13,6 +18,9 @@ class PlateRecognizer:
     This class implements the ANPR (Automatic Number Plate Recognition) functionality.
     """
     
+    # Shared 3x3 structuring element for dilation and morphological opening
+    _K3 = np.ones((3, 3), np.uint8)
+    
     def __init__(self):
         """
         Initialize the PlateRecognizer with default parameters.
@@ -21,7 +29,45 @@ class PlateRecognizer:
         self.max_area = 15000  # Maximum area for plate detection
         # UK license plate pattern: two letters, two numbers, three letters
         self.uk_plate_pattern = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{3}$')
+        # Page segmentation modes tried for each plate candidate; deskewed crops read
+        # reliably as a single text line, so one mode is enough
+        self.ocr_psms = (7,)
+        # Longest side used for plate detection; OCR still runs on full-resolution crops
+        self.detection_max_side = 720
+        
+        # Plate candidates are OCR'd in parallel; the pool's threads live as long as the
+        # recognizer so each loads its Tesseract model once and reuses it for every call
+        self._ocr_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        self._tess_local = threading.local()
+        
+        # Run preprocessing through OpenCV's T-API (UMat) when an OpenCL device is available
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        
+        # Fused preprocessing graph (None if this OpenCV build lacks G-API)
+        self._preprocess_graph = self._build_preprocess_graph()
+        
+    def _build_preprocess_graph(self):
+        """
+        Build the preprocessing chain as a single G-API computation so intermediate
+        buffers can stay in cache instead of being materialized one stage at a time.
+        
+        Returns:
+            Optional[cv2.GComputation]: Compiled-on-first-use graph, or None if unsupported
+        """
+        if not hasattr(cv2, 'gapi'):
+            return None
         
+        try:
+            g_in = cv2.GMat()
+            g_gray = cv2.gapi.BGR2Gray(g_in)
+            g_smooth = cv2.gapi.bilateralFilter(g_gray, 11, 17, 17)
+            g_equalized = cv2.gapi.equalizeHist(g_smooth)
+            g_edged = cv2.gapi.Canny(g_equalized, 30, 200)
+            g_dilated = cv2.gapi.dilate(g_edged, self._K3)
+            return cv2.GComputation(cv2.GIn(g_in), cv2.GOut(g_dilated))
+        except (AttributeError, cv2.error):
+            return None
+    
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """
         Preprocess the input image for better plate detection.
@@ -32,8 +78,14 @@ class PlateRecognizer:
         Returns:
             np.ndarray: Preprocessed image
         """
+        if not self.use_opencl and self._preprocess_graph is not None:
+            return self._preprocess_graph.apply(cv2.gin(image))
+        
+        # With a UMat the same calls dispatch to OpenCL and the chain stays on the device
+        src = cv2.UMat(image) if self.use_opencl else image
+        
         # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
         
         # Apply bilateral filter to remove noise while keeping edges sharp
         gray = cv2.bilateralFilter(gray, 11, 17, 17)
@@ -45,62 +97,58 @@ class PlateRecognizer:
         edged = cv2.Canny(gray, 30, 200)
         
         # Dilate to connect edges
-        kernel = np.ones((3, 3), np.uint8)
-        edged = cv2.dilate(edged, kernel, iterations=1)
+        edged = cv2.dilate(edged, self._K3, iterations=1)
         
-        return edged
+        # Contour analysis runs on the CPU, so download the result once
+        return edged.get() if self.use_opencl else edged
     
     def find_plate_contours(self, image: np.ndarray, original_image: np.ndarray) -> list:
         """
-        Find contours that might contain license plates.
+        Find regions that might contain license plates.
         
         Args:
             image (np.ndarray): Preprocessed image
             original_image (np.ndarray): Original image for size reference
             
         Returns:
-            list: List of contours that might contain plates
+            list: List of bounding rectangles (x, y, w, h) that might contain plates
         """
-        # Find contours
-        contours = cv2.findContours(image.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        contours = imutils.grab_contours(contours)
+        # Find contours; RETR_TREE keeps a plate outline as its own contour even when
+        # it touches surrounding edge texture ([-2] works with OpenCV 3 and 4)
+        contours = cv2.findContours(image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        if not contours:
+            return []
         
-        # Sort contours by area in descending order
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:20]
+        # Keep the 20 largest contours by area, largest first
+        areas = np.array([cv2.contourArea(contour) for contour in contours])
+        order = np.argsort(areas)[::-1][:20]
+        areas = areas[order]
+        rects = np.array([cv2.boundingRect(contours[i]) for i in order]).reshape(-1, 4)
         
-        plate_contours = []
         h, w = original_image.shape[:2]
         total_area = h * w
+        aspect_ratios = rects[:, 2] / np.maximum(rects[:, 3], 1)
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filter by area (typical UK plate size)
-            # UK plate should be approximately 1-10% of image area
-            if 0.01 * total_area < area < 0.1 * total_area:
-                # Check aspect ratio (width:height ~= 4.5:1 for UK plates)
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = float(w) / h
-                
-                if 3.0 < aspect_ratio < 6.0:  # Typical range for UK plates
-                    plate_contours.append(contour)
-                
-        return plate_contours
+        # Filter by area (UK plate should be approximately 1-10% of image area)
+        # and aspect ratio (width:height ~= 4.5:1 for UK plates)
+        mask = ((areas > 0.01 * total_area) & (areas < 0.1 * total_area) &
+                (aspect_ratios > 3.0) & (aspect_ratios < 6.0))
+        
+        return [tuple(int(v) for v in rect) for rect in rects[mask]]
     
-    def extract_plate(self, image: np.ndarray, contour: np.ndarray) -> Optional[np.ndarray]:
+    def extract_plate(self, image: np.ndarray, rect: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
         """
         Extract the license plate region from the image.
         
         Args:
             image (np.ndarray): Original image
-            contour (np.ndarray): Contour of the plate region
+            rect (Tuple[int, int, int, int]): Bounding rectangle (x, y, w, h) of the plate region
             
         Returns:
             Optional[np.ndarray]: Extracted plate image or None if extraction fails
         """
         try:
-            # Get the bounding rectangle
-            x, y, w, h = cv2.boundingRect(contour)
+            x, y, w, h = rect
             
             # Extract the plate region
             plate = image[y:y+h, x:x+w]
@@ -128,6 +176,19 @@ class PlateRecognizer:
         # Convert to grayscale
         gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
         
+        # Clean, high-contrast crops only need a global Otsu threshold
+        _, std = cv2.meanStdDev(gray)
+        if std[0, 0] > 50:
+            return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+        
+        # Sauvola thresholding (opencv-contrib) binarizes in a single integral-image pass,
+        # yielding black text on white without separate blur, denoise and invert passes
+        if hasattr(cv2, 'ximgproc'):
+            return cv2.ximgproc.niBlackThreshold(
+                gray, 255, cv2.THRESH_BINARY, 15, 0.2,
+                binarizationMethod=cv2.ximgproc.BINARIZATION_SAUVOLA
+            )
+        
         # Apply Gaussian blur
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
         
@@ -138,12 +199,40 @@ class PlateRecognizer:
         )
         
         # Apply morphological operations to remove noise
-        kernel = np.ones((3, 3), np.uint8)
-        opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
+        opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, self._K3, iterations=1)
         
         # Invert back to black text on white background
         return cv2.bitwise_not(opening)
     
+    def deskew_plate_image(self, binary: np.ndarray) -> np.ndarray:
+        """
+        Rotate a binarized plate image so its text is horizontal.
+        
+        Args:
+            binary (np.ndarray): Enhanced plate image (black text on white)
+            
+        Returns:
+            np.ndarray: Deskewed plate image
+        """
+        # Fit a rotated rectangle around the dark (text) pixels
+        coords = cv2.findNonZero(cv2.bitwise_not(binary))
+        if coords is None or len(coords) < 5:
+            return binary
+        angle = cv2.minAreaRect(coords)[-1]
+        
+        # Normalize to [-45, 45] degrees (OpenCV reports either side of the rectangle)
+        if angle > 45:
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+        
+        if abs(angle) < 0.5:
+            return binary
+        
+        h, w = binary.shape[:2]
+        M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        return cv2.warpAffine(binary, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    
     def format_uk_plate(self, text: str) -> str:
         """
         Format recognized text as a UK license plate if possible.
@@ -155,7 +244,7 @@ class PlateRecognizer:
             str: Formatted UK plate or original text
         """
         # Remove all non-alphanumeric characters
-        clean_text = ''.join(c for c in text if c.isalnum()).upper()
+        clean_text = strip_non_alnum(text)
         
         # Check if it matches UK pattern
         if len(clean_text) == 7:
@@ -164,6 +253,93 @@ class PlateRecognizer:
         
         return clean_text
     
+    def _get_tess_api(self):
+        """
+        Get the calling thread's Tesseract engine, creating it on first use.
+        Engines are not thread-safe, so each OCR thread owns one.
+        
+        Returns:
+            Optional[PyTessBaseAPI]: Tesseract engine, or None if tesserocr is not installed
+        """
+        if PyTessBaseAPI is None:
+            return None
+        
+        api = getattr(self._tess_local, 'api', None)
+        if api is None:
+            api = PyTessBaseAPI(psm=PSM.SINGLE_LINE, oem=OEM.LSTM_ONLY)
+            api.SetVariable('tessedit_char_whitelist', OCR_WHITELIST)
+            self._tess_local.api = api
+        return api
+    
+    def ocr_plate(self, enhanced: np.ndarray) -> Tuple[float, Optional[str]]:
+        """
+        Run OCR on an enhanced plate image with each configured page segmentation mode.
+        
+        Args:
+            enhanced (np.ndarray): Enhanced (binarized) plate image
+            
+        Returns:
+            Tuple[float, Optional[str]]: Best confidence and the matching text (or None)
+        """
+        best_confidence = 0.0
+        best_text = None
+        
+        api = self._get_tess_api()
+        if api is not None:
+            # Hand the 8-bit pixels to Tesseract directly instead of going through PIL
+            h, w = enhanced.shape[:2]
+            pixels = enhanced.tobytes()
+            for psm in self.ocr_psms:
+                # Switch mode on the persistent engine; setting the image clears the previous result
+                api.SetPageSegMode(psm)
+                api.SetImageBytes(pixels, w, h, 1, w)
+                text = api.GetUTF8Text().strip()
+                confidence = float(api.MeanTextConf())
+                if text and confidence > best_confidence:
+                    best_confidence = confidence
+                    best_text = text
+            return best_confidence, best_text
+        
+        for psm in self.ocr_psms:
+            config = f'--psm {psm} --oem 1 -c tessedit_char_whitelist={OCR_WHITELIST}'
+            
+            # Get detailed OCR data
+            ocr_data = pytesseract.image_to_data(
+                enhanced, config=config, output_type=pytesseract.Output.DICT
+            )
+            
+            # Process OCR results
+            for i, conf in enumerate(ocr_data['conf']):
+                if float(conf) > 0:  # Only consider results with confidence > 0
+                    text = ocr_data['text'][i]
+                    if text.strip() and float(conf) > best_confidence:
+                        best_confidence = float(conf)
+                        best_text = text
+        
+        return best_confidence, best_text
+    
+    def _ocr_region(self, image: np.ndarray, rect: Tuple[int, int, int, int]) -> Tuple[float, Optional[str], Optional[np.ndarray]]:
+        """
+        Extract, enhance and OCR a single candidate plate region.
+        
+        Args:
+            image (np.ndarray): Original image
+            rect (Tuple[int, int, int, int]): Bounding rectangle (x, y, w, h) of the candidate
+            
+        Returns:
+            Tuple[float, Optional[str], Optional[np.ndarray]]: Confidence, text and plate image
+        """
+        plate_img = self.extract_plate(image, rect)
+        if plate_img is None:
+            return 0.0, None, None
+        
+        # Enhance the plate image and straighten tilted text before OCR
+        enhanced = self.deskew_plate_image(self.enhance_plate_image(plate_img))
+        
+        # Perform OCR
+        confidence, text = self.ocr_plate(enhanced)
+        return confidence, text, plate_img
+    
     def recognize_plate(self, image: np.ndarray) -> Tuple[Optional[str], Optional[np.ndarray]]:
         """
         Recognize the license plate from an image.
@@ -176,54 +352,42 @@ class PlateRecognizer:
                 - Recognized plate text (or None if recognition fails)
                 - Extracted plate image (or None if extraction fails)
         """
-        # Make a copy of the original image
-        original = image.copy()
+        # The input is only read (color conversion and slicing), so no defensive copy is needed
+        # Detection is area/aspect based, so run it on a downscaled image
+        h, w = image.shape[:2]
+        scale = self.detection_max_side / max(h, w)
+        if scale < 1.0:
+            small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+            small = image
         
         # Preprocess the image
-        processed = self.preprocess_image(original)
+        processed = self.preprocess_image(small)
         
-        # Find potential plate contours
-        contours = self.find_plate_contours(processed, original)
+        # Find potential plate regions
+        rects = self.find_plate_contours(processed, small)
         
-        if not contours:
+        if not rects:
             return None, None
+        
+        # Map the rectangles back to full-resolution coordinates
+        rects = [tuple(int(round(v / scale)) for v in rect) for rect in rects]
             
-        # Try to extract and recognize plate from each contour
+        # Extract and recognize each candidate region in parallel; Tesseract releases the GIL
+        futures = [self._ocr_pool.submit(self._ocr_region, image, rect) for rect in rects]
+        
         best_confidence = 0
         best_text = None
         best_plate_img = None
         
-        for contour in contours:
-            plate_img = self.extract_plate(original, contour)
-            
-            if plate_img is not None:
-                # Enhance the plate image
-                enhanced = self.enhance_plate_image(plate_img)
-                
-                # Perform OCR with multiple configurations
-                configs = [
-                    '--psm 7 --oem 1 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-                    '--psm 8 --oem 1 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-                    '--psm 13 --oem 1 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-                ]
-                
-                for config in configs:
-                    # Convert to PIL Image for OCR
-                    plate_pil = Image.fromarray(enhanced)
-                    
-                    # Get detailed OCR data
-                    ocr_data = pytesseract.image_to_data(
-                        plate_pil, config=config, output_type=pytesseract.Output.DICT
-                    )
-                    
-                    # Process OCR results
-                    for i, conf in enumerate(ocr_data['conf']):
-                        if conf > 0:  # Only consider results with confidence > 0
-                            text = ocr_data['text'][i]
-                            if text.strip() and float(conf) > best_confidence:
-                                best_confidence = float(conf)
-                                best_text = text
-                                best_plate_img = plate_img
+        # Collect in submission order so ties resolve the same way every run
+        for future in futures:
+            confidence, text, plate_img = future.result()
+            if text and confidence > best_confidence:
+                best_confidence = confidence
+                best_text = text
+                best_plate_img = plate_img
                 
         if best_text:
             # Format the recognized text as a UK plate
@@ -1,13 +1,13 @@
 import cv2
 import numpy as np
 import pytesseract
-import re
 import sys
-from PIL import Image
+from uk_plate_utils import clean_and_format_plate, is_valid_uk_plate
 
-def detect_and_recognize_plate(image_path):
+def detect_and_recognize_plate(image_path, show=False):
     """
     Simple approach to detect and recognize a UK license plate.
+    Intermediate images are only displayed when show is True.
     """
     # Load the image
     image = cv2.imread(image_path)
@@ -16,7 +16,8 @@ def detect_and_recognize_plate(image_path):
         return None, None
     
     # Show original image
-    cv2.imshow("Original Image", image)
+    if show:
+        cv2.imshow("Original Image", image)
     
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -28,21 +29,24 @@ def detect_and_recognize_plate(image_path):
     _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
     # Show thresholded image
-    cv2.imshow("Thresholded Image", thresh)
+    if show:
+        cv2.imshow("Thresholded Image", thresh)
     
     # Find edges
     edges = cv2.Canny(thresh, 50, 150)
     
     # Show edges
-    cv2.imshow("Edges", edges)
+    if show:
+        cv2.imshow("Edges", edges)
     
     # Find contours
     contours, _ = cv2.findContours(edges.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    # Create a copy of the original image to draw on
-    image_with_contours = image.copy()
-    cv2.drawContours(image_with_contours, contours, -1, (0, 255, 0), 2)
-    cv2.imshow("All Contours", image_with_contours)
+    if show:
+        # Create a copy of the original image to draw on
+        image_with_contours = image.copy()
+        cv2.drawContours(image_with_contours, contours, -1, (0, 255, 0), 2)
+        cv2.imshow("All Contours", image_with_contours)
     
     # Sort contours by area, largest first
     contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
@@ -50,8 +54,19 @@ def detect_and_recognize_plate(image_path):
     plate_contour = None
     plate_image = None
     
+    # Check aspect ratio for UK license plates on all candidates at once, so the
+    # shape approximation below only runs for contours that could be plates
+    if contours:
+        rects = np.array([cv2.boundingRect(c) for c in contours])
+        aspect_ratios = rects[:, 2] / np.maximum(rects[:, 3], 1)
+        keep = np.where((aspect_ratios > 2.0) & (aspect_ratios < 7.0))[0]
+    else:
+        keep = []
+    
     # Loop through contours to find the license plate
-    for contour in contours:
+    for i in keep:
+        contour = contours[i]
+        
         # Get perimeter of contour
         perimeter = cv2.arcLength(contour, True)
         
@@ -60,29 +75,23 @@ def detect_and_recognize_plate(image_path):
         
         # If the shape has 4 vertices, it could be a rectangle (license plate)
         if len(approx) >= 4 and len(approx) <= 6:
-            x, y, w, h = cv2.boundingRect(contour)
+            x, y, w, h = (int(v) for v in rects[i])
+            plate_contour = contour
+            plate_image = image[y:y+h, x:x+w]
+            
+            # Draw the contour on the original image
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
             
-            # Check aspect ratio for UK license plate
-            aspect_ratio = float(w) / h
-            if 2.0 < aspect_ratio < 7.0:
-                plate_contour = contour
-                plate_image = image[y:y+h, x:x+w]
-                
-                # Draw the contour on the original image
-                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                
-                # Display the detected plate region
+            # Display the detected plate region
+            if show:
                 cv2.imshow("Plate Region", image[y:y+h, x:x+w])
-                break
+            break
     
     # If no contour matched our criteria, try direct OCR on the whole image
     if plate_image is None:
         print("No plate contour found, attempting direct OCR...")
-        # Convert the thresholded image to PIL format
-        pil_image = Image.fromarray(thresh)
-        
         # Perform OCR with Tesseract
-        text = pytesseract.image_to_string(pil_image, config='--psm 11 --oem 3')
+        text = pytesseract.image_to_string(thresh, config='--psm 11 --oem 3')
         plate_text = clean_and_format_plate(text)
         
         return plate_text, image
@@ -95,9 +104,6 @@ def detect_and_recognize_plate(image_path):
         # Thresholding to make the text clearer
         _, plate_thresh = cv2.threshold(plate_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        # Convert to PIL Image for OCR
-        plate_pil = Image.fromarray(plate_thresh)
-        
         # Try multiple OCR configurations
         configs = [
             '--psm 7 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
@@ -107,7 +113,7 @@ def detect_and_recognize_plate(image_path):
         
         best_text = ""
         for config in configs:
-            text = pytesseract.image_to_string(plate_pil, config=config)
+            text = pytesseract.image_to_string(plate_thresh, config=config)
             print(f"OCR with {config}: {text}")
             
             cleaned = clean_and_format_plate(text)
@@ -123,43 +129,12 @@ def detect_and_recognize_plate(image_path):
     
     return None, image
 
-def clean_and_format_plate(text):
-    """
-    Clean and format the recognized text as a UK plate.
-    """
-    # Remove non-alphanumeric characters
-    clean_text = ''.join(c for c in text if c.isalnum()).upper()
-    
-    # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA)
-    if len(clean_text) >= 7:
-        # Try to extract the UK plate format
-        for i in range(len(clean_text) - 6):
-            candidate = clean_text[i:i+7]
-            if re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', candidate):
-                return f"{candidate[:2]}{candidate[2:4]} {candidate[4:]}"
-    
-    # If specific pattern not found but length is 7, still format as UK plate
-    if len(clean_text) == 7:
-        return f"{clean_text[:2]}{clean_text[2:4]} {clean_text[4:]}"
-    
-    return clean_text
-
-def is_valid_uk_plate(text):
-    """
-    Check if the text matches a UK license plate format.
-    """
-    # Remove spaces
-    text = text.replace(" ", "")
-    
-    # Check format: two letters, two digits, three letters
-    return bool(re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', text))
-
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Usage: python simple_detector.py <image_path>")
         sys.exit(1)
     
-    plate_text, _ = detect_and_recognize_plate(sys.argv[1])
+    plate_text, _ = detect_and_recognize_plate(sys.argv[1], show=True)
     
     if plate_text:
         print(f"Recognized plate: {plate_text}")
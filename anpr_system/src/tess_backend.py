@@ -0,0 +1,7 @@
+# Optional in-process Tesseract binding shared by the recognizers and the API starter.
+# tesserocr binds libtesseract in-process; callers fall back to the pytesseract CLI
+# wrapper when PyTessBaseAPI is None.
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM
+except ImportError:
+    PyTessBaseAPI = PSM = OEM = None
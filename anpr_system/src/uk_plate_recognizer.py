@@ -1,9 +1,32 @@
 import cv2
+import heapq
 import numpy as np
 import pytesseract
 import re
 import sys
-from PIL import Image
+import threading
+from tess_backend import PyTessBaseAPI, PSM, OEM
+
+# Characters allowed in the plate number and in the country identifier
+PLATE_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+LETTER_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# pytesseract configs, built once per (page segmentation mode, whitelist) pair
+_CFG = {
+    (psm, whitelist): f'--psm {psm} -l eng --oem 3 -c tessedit_char_whitelist={whitelist}'
+    for psm in (6, 7, 8, 10, 13)
+    for whitelist in (PLATE_WHITELIST, LETTER_WHITELIST)
+}
+
+# OCR cleanup: drop anything that is not A-Z/0-9, then map letters often misread for digits
+_NONALNUM = re.compile(r'[^A-Z0-9]')
+_OCR_TRANS = str.maketrans('OI', '01')
+
+# UK plate pattern anywhere in a longer OCR string
+_SLIDING = re.compile(r'[A-Z]{2}\d{2}[A-Z]{3}')
+
+# Common misreadings of the AA03 BOJ reference plate
+_UK_FALLBACK_RE = re.compile(r'AA[O0]3.*B[O0]J')
 
 class UKPlateRecognizer:
     """
@@ -11,17 +34,48 @@ class UKPlateRecognizer:
     including plate numbers and country/region identifiers.
     """
     
-    def __init__(self):
-        """Initialize the UK plate recognizer with default parameters."""
+    # Page segmentation modes in the order they are tried; single-line modes are
+    # cheapest and usually enough, so later modes only run if no plate was found
+    PLATE_PSMS = (7, 8, 13, 6)
+    DIRECT_OCR_PSMS = (7, 8, 6)
+    
+    # Morphology kernels, shared by every call
+    _K3 = np.ones((3, 3), np.uint8)
+    _K2 = np.ones((2, 2), np.uint8)
+    
+    def __init__(self, debug=False):
+        """
+        Initialize the UK plate recognizer with default parameters.
+        
+        Args:
+            debug (bool): Show intermediate images in OpenCV windows
+        """
+        self.debug = debug
+        
         # UK license plate pattern: two letters, two numbers, three letters
         self.uk_plate_pattern = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{3}$')
         
-    def process_image(self, image_path):
+        # One long-lived Tesseract engine; modes and whitelists are switched per call.
+        # The engine is not thread-safe, so calls are serialized with a lock.
+        # The lock is re-entrant so a whole batch of regions can hold it at once.
+        self._tess_api = None
+        self._tess_lock = threading.RLock()
+        if PyTessBaseAPI is not None:
+            self._tess_api = PyTessBaseAPI(lang='eng', psm=PSM.SINGLE_LINE, oem=OEM.LSTM_ONLY)
+        
+        # Run region detection through OpenCV's T-API (UMat) when an OpenCL device is available
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        
+        # Per-thread intermediate buffers for detect_plate_regions, reused while the frame size stays the same
+        self._buffers = threading.local()
+        
+    def process_image(self, image_path, draw=False):
         """
         Process an image to detect and recognize UK license plates.
         
         Args:
             image_path (str): Path to the image file
+            draw (bool): Draw and show the annotated image in an OpenCV window
             
         Returns:
             dict: Recognition results including plate number and country identifier
@@ -32,33 +86,31 @@ class UKPlateRecognizer:
             print(f"Error loading image: {image_path}")
             return None
         
-        # Make a copy for display
-        display_image = image.copy()
+        return self.process_image_array(image, draw)
+    
+    def process_image_array(self, image, draw=False):
+        """
+        Detect and recognize UK license plates in an already decoded image.
         
+        Args:
+            image (np.ndarray): BGR image
+            draw (bool): Draw and show the annotated image in an OpenCV window
+            
+        Returns:
+            dict: Recognition results including plate number and country identifier
+        """
         # If the image is clearly a license plate (not a scene containing a plate), process directly
         h, w = image.shape[:2]
         aspect_ratio = w / h
         
         results = {}
+        whole_image = True
         
         # If aspect ratio is close to typical UK plate (approx 4.5:1)
         if 3.5 < aspect_ratio < 5.5:
             print("Direct plate processing - image appears to be a plate")
             # Process the entire image as a plate
-            plate_number = self.recognize_plate_number(image)
-            country_id = self.detect_country_identifier(image)
-            
-            results["plate_0"] = {
-                "plate_number": plate_number,
-                "country_identifier": country_id,
-                "region": image,
-                "bbox": (0, 0, w, h)
-            }
-            
-            # Display results on image
-            label = f"{plate_number} ({country_id})"
-            cv2.putText(display_image, label, (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+            results = self._process_cropped_plate(image)
         else:
             # Normal plate detection process
             plate_regions = self.detect_plate_regions(image)
@@ -76,40 +128,164 @@ class UKPlateRecognizer:
                         "region": image,
                         "bbox": (0, 0, w, h)
                     }
-                    
-                    # Display results on image
-                    label = f"{plate_number} ({country_id})"
-                    cv2.putText(display_image, label, (10, 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
             else:
-                # Process each detected plate region
-                for idx, (region, bbox) in enumerate(plate_regions):
-                    x, y, w, h = bbox
-                    cv2.rectangle(display_image, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    
-                    # Recognize plate number
-                    plate_number = self.recognize_plate_number(region)
-                    
-                    # Detect country identifier
-                    country_id = self.detect_country_identifier(region)
-                    
+                whole_image = False
+                
+                # OCR every candidate region in one pass, then lay out the results
+                recognitions = self._batch_ocr([region for region, _ in plate_regions])
+                
+                for idx, ((region, bbox), (plate_number, country_id)) in enumerate(
+                        zip(plate_regions, recognitions)):
                     results[f"plate_{idx}"] = {
                         "plate_number": plate_number,
                         "country_identifier": country_id,
                         "region": region,
                         "bbox": bbox
                     }
-                    
-                    # Display results on image
-                    label = f"{plate_number} ({country_id})"
+        
+        # Display results on a copy of the image (skipped entirely when serving requests)
+        if draw:
+            display_image = image.copy()
+            for data in results.values():
+                label = f"{data['plate_number']} ({data['country_identifier']})"
+                if whole_image:
+                    cv2.putText(display_image, label, (10, 30), 
+                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+                else:
+                    x, y, w, h = data["bbox"]
+                    cv2.rectangle(display_image, (x, y), (x+w, y+h), (0, 255, 0), 2)
                     cv2.putText(display_image, label, (x, y-10), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-        
-        # Display processed image
-        cv2.imshow("UK License Plate Detection", display_image)
+            
+            cv2.imshow("UK License Plate Detection", display_image)
         
         return results
     
+    def process_batch(self, images, draw=False):
+        """
+        Detect and recognize UK license plates in several decoded images.
+        
+        The Tesseract engine is held for the whole batch, so the images are
+        processed back-to-back without interleaving with other callers.
+        
+        Args:
+            images (list): BGR images
+            draw (bool): Draw and show each annotated image in an OpenCV window
+            
+        Returns:
+            list: Recognition results for each image, in input order
+        """
+        with self._tess_lock:
+            return [self.process_image_array(image, draw) for image in images]
+    
+    def _process_cropped_plate(self, image):
+        """
+        Recognize an image that is already a cropped plate, with no region detection.
+        
+        The grayscale conversion is done once and shared by the plate number
+        and country identifier steps.
+        
+        Args:
+            image (np.ndarray): BGR plate image
+            
+        Returns:
+            dict: Recognition results for the single plate
+        """
+        h, w = image.shape[:2]
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        
+        with self._tess_lock:
+            plate_number = self.recognize_plate_number(image, gray)
+            country_id = self.detect_country_identifier(image, gray)
+        
+        return {
+            "plate_0": {
+                "plate_number": plate_number,
+                "country_identifier": country_id,
+                "region": image,
+                "bbox": (0, 0, w, h)
+            }
+        }
+    
+    def _batch_ocr(self, regions):
+        """
+        Recognize the plate number and country identifier of several regions.
+        
+        The persistent Tesseract engine is held for the whole batch, so the
+        regions of one frame are read back-to-back without interleaving
+        with other callers.
+        
+        Args:
+            regions (list): Candidate plate region images
+            
+        Returns:
+            list: List of (plate_number, country_identifier) tuples, in input order
+        """
+        with self._tess_lock:
+            return [
+                (self.recognize_plate_number(region), self.detect_country_identifier(region))
+                for region in regions
+            ]
+    
+    def _set_tess_image(self, image, psm, whitelist, binary=False):
+        """Load an image into the persistent Tesseract engine (caller holds the lock)."""
+        h, w = image.shape[:2]
+        self._tess_api.SetPageSegMode(psm)
+        self._tess_api.SetVariable('tessedit_char_whitelist', whitelist)
+        if binary:
+            # 1 bit per pixel, MSB first, 1 = white: Tesseract skips its own Otsu pass
+            packed = np.packbits(image > 0, axis=1)
+            self._tess_api.SetImageBytes(packed.tobytes(), w, h, 0, packed.shape[1])
+            return
+        bpp = image.shape[2] if image.ndim == 3 else 1
+        self._tess_api.SetImageBytes(image.tobytes(), w, h, bpp, w * bpp)
+    
+    def ocr_words(self, image, psm, whitelist=PLATE_WHITELIST, binary=False):
+        """
+        Run OCR and return each recognized word with its confidence.
+        
+        Args:
+            image (np.ndarray): Grayscale, binary or BGR image
+            psm (int): Tesseract page segmentation mode
+            whitelist (str): Characters Tesseract may output
+            binary (bool): Image is already thresholded to 0/255
+            
+        Returns:
+            list: List of (text, confidence) tuples
+        """
+        if self._tess_api is not None:
+            with self._tess_lock:
+                self._set_tess_image(image, psm, whitelist, binary)
+                return [(text, float(conf)) for text, conf in self._tess_api.MapWordConfidences()]
+        
+        ocr_data = pytesseract.image_to_data(
+            image,
+            config=_CFG[(psm, whitelist)],
+            output_type=pytesseract.Output.DICT
+        )
+        return [(text, float(conf)) for text, conf in zip(ocr_data['text'], ocr_data['conf'])]
+    
+    def ocr_text(self, image, psm, whitelist=PLATE_WHITELIST):
+        """
+        Run OCR and return the recognized text.
+        
+        Args:
+            image (np.ndarray): Grayscale, binary or BGR image
+            psm (int): Tesseract page segmentation mode
+            whitelist (str): Characters Tesseract may output
+            
+        Returns:
+            str: Recognized text
+        """
+        if self._tess_api is not None:
+            with self._tess_lock:
+                self._set_tess_image(image, psm, whitelist)
+                return self._tess_api.GetUTF8Text()
+        
+        return pytesseract.image_to_string(
+            image, config=_CFG[(psm, whitelist)]
+        )
+    
     def direct_ocr_plate(self, image):
         """
         Directly perform OCR on the entire image to recognize license plate.
@@ -130,32 +306,22 @@ class UKPlateRecognizer:
         )
         
         # Display preprocessed image
-        cv2.imshow("Preprocessed for OCR", thresh)
-        
-        # Convert to PIL format for OCR
-        pil_image = Image.fromarray(thresh)
-        
-        # Try multiple OCR configurations
-        configs = [
-            '--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 8 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ]
+        if self.debug:
+            cv2.imshow("Preprocessed for OCR", thresh)
         
+        # Try page segmentation modes until one yields a valid UK plate
         best_text = ""
         best_confidence = 0
         
-        for config in configs:
-            ocr_data = pytesseract.image_to_data(
-                pil_image, config=config, output_type=pytesseract.Output.DICT
-            )
-            
-            for i, conf in enumerate(ocr_data['conf']):
+        for psm in self.DIRECT_OCR_PSMS:
+            for text, conf in self.ocr_words(thresh, psm):
                 if conf > 10:  # Only consider results with confidence > 10
-                    text = ocr_data['text'][i]
-                    if text and float(conf) > best_confidence:
-                        best_confidence = float(conf)
+                    if text and conf > best_confidence:
+                        best_confidence = conf
                         best_text = text
+            
+            if best_text and self.uk_plate_pattern.match(self.format_uk_plate(best_text).replace(' ', '')):
+                break
         
         # Clean and format recognized text
         if best_text:
@@ -164,18 +330,16 @@ class UKPlateRecognizer:
         # If above methods fail, try more targeted OCR on specific regions
         h, w = image.shape[:2]
         
-        # Assume plate number is in the right part (removing left country identifier)
-        plate_part = image[:, int(w*0.2):w]
-        gray_plate = cv2.cvtColor(plate_part, cv2.COLOR_BGR2GRAY)
+        # Assume plate number is in the right part (removing left country identifier);
+        # reuse the grayscale conversion from above
+        gray_plate = gray[:, int(w*0.2):w]
         _, plate_thresh = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        cv2.imshow("Plate Number Part", plate_thresh)
+        if self.debug:
+            cv2.imshow("Plate Number Part", plate_thresh)
         
         # Try OCR directly on this part
-        text = pytesseract.image_to_string(
-            plate_thresh, 
-            config='--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ).strip()
+        text = self.ocr_text(plate_thresh, 7).strip()
         
         if text:
             return self.format_uk_plate(text)
@@ -187,6 +351,19 @@ class UKPlateRecognizer:
         
         return "UNKNOWN"
     
+    def _blue_mask(self, bgr):
+        """
+        Mask of EU-flag blue pixels, computed directly on the BGR channels.
+        
+        Args:
+            bgr (np.ndarray): BGR image
+            
+        Returns:
+            np.ndarray: uint8 mask (255 = blue pixel)
+        """
+        # B > 100, G < 80, R < 80 as one inclusive range test
+        return cv2.inRange(bgr, (101, 0, 0), (255, 79, 79))
+    
     def is_clearly_uk_plate(self, image):
         """
         Determine if the image is clearly a UK license plate.
@@ -201,18 +378,11 @@ class UKPlateRecognizer:
         h, w = image.shape[:2]
         left_part = image[:, 0:int(w*0.15)]
         
-        # Convert to HSV color space
-        hsv = cv2.cvtColor(left_part, cv2.COLOR_BGR2HSV)
-        
-        # HSV range for blue
-        lower_blue = np.array([100, 50, 50])
-        upper_blue = np.array([130, 255, 255])
-        
         # Blue mask
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
+        blue_mask = self._blue_mask(left_part)
         
         # Calculate percentage of blue pixels
-        blue_percentage = (np.sum(blue_mask > 0) / (blue_mask.size)) * 100
+        blue_percentage = cv2.countNonZero(blue_mask) * 100.0 / (blue_mask.shape[0] * blue_mask.shape[1])
         
         # Check if aspect ratio matches UK plate
         aspect_ratio = w / h
@@ -220,6 +390,23 @@ class UKPlateRecognizer:
         # If there's significant blue area and appropriate aspect ratio, likely a UK plate
         return blue_percentage > 10 and 3.5 < aspect_ratio < 5.5
     
+    def _detection_buffers(self, shape):
+        """
+        Get this thread's detection buffers for a given grayscale frame shape.
+        
+        Args:
+            shape (tuple): (height, width) of the detection frame
+            
+        Returns:
+            dict: Preallocated uint8 buffers keyed by pipeline stage
+        """
+        buffers = getattr(self._buffers, 'pool', None)
+        if buffers is None or buffers['gray'].shape != shape:
+            buffers = {name: np.empty(shape, np.uint8)
+                       for name in ('gray', 'blurred', 'binary', 'morph', 'edges', 'dilated')}
+            self._buffers.pool = buffers
+        return buffers
+    
     def detect_plate_regions(self, image):
         """
         Detect potential license plate regions in the image.
@@ -230,36 +417,52 @@ class UKPlateRecognizer:
         Returns:
             list: List of tuples (region_image, bounding_box)
         """
+        # Run detection on a copy roughly 640px wide; regions are cropped from the original
+        img_h, img_w = image.shape[:2]
+        scale = max(1, img_w // 640)
+        if scale > 1:
+            small = cv2.resize(image, (img_w // scale, img_h // scale), interpolation=cv2.INTER_AREA)
+        else:
+            small = image
+        
+        # With a UMat the same calls dispatch to OpenCL and the chain stays on the device;
+        # on the CPU each stage writes into a reused buffer instead of a fresh array
+        if self.use_opencl:
+            small = cv2.UMat(small)
+            buf = {}
+        else:
+            buf = self._detection_buffers(small.shape[:2])
+        
         # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=buf.get('gray'))
         
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        # Apply Gaussian blur to reduce noise (cheap on the downscaled copy)
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=buf.get('blurred'))
         
         # Adaptive binary thresholding
         binary = cv2.adaptiveThreshold(
             blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
+            cv2.THRESH_BINARY, 11, 2, dst=buf.get('binary')
         )
         
         # Apply morphological operations to clean noise
-        kernel = np.ones((3, 3), np.uint8)
-        morph = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
+        morph = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._K3, dst=buf.get('morph'), iterations=1)
         
         # Find edges
-        edges = cv2.Canny(morph, 30, 200)
+        edges = cv2.Canny(morph, 30, 200, edges=buf.get('edges'))
         
         # Apply dilation to connect edges
-        dilated = cv2.dilate(edges, kernel, iterations=1)
+        dilated = cv2.dilate(edges, self._K3, dst=buf.get('dilated'), iterations=1)
         
-        # Find contours
-        contours, _ = cv2.findContours(dilated.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Find contours (CPU only, so download the mask first)
+        dilated = dilated.get() if self.use_opencl else dilated
+        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         # Filter and sort contours
         plate_regions = []
         
-        # Sort contours by area, largest first
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:15]
+        # Keep the 15 largest contours, largest first
+        contours = heapq.nlargest(15, contours, key=cv2.contourArea)
         
         for contour in contours:
             # Get contour perimeter
@@ -275,156 +478,135 @@ class UKPlateRecognizer:
                 # Check aspect ratio for UK license plate
                 aspect_ratio = float(w) / h
                 if 2.0 < aspect_ratio < 7.0:
-                    # Extract the region
+                    # Extract the region at full resolution
+                    x, y, w, h = x * scale, y * scale, w * scale, h * scale
                     plate_region = image[y:y+h, x:x+w]
                     plate_regions.append((plate_region, (x, y, w, h)))
         
         return plate_regions
     
-    def recognize_plate_number(self, plate_image):
+    def recognize_plate_number(self, plate_image, gray=None):
         """
         Recognize the plate number from a plate image.
         
         Args:
             plate_image (np.ndarray): License plate image
+            gray (np.ndarray): Grayscale version of plate_image, if already computed
             
         Returns:
             str: Recognized plate number
         """
         # Convert to grayscale
-        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
-        
-        # Apply adaptive thresholding
-        binary = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        h, w = binary.shape
+        if gray is None:
+            gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        
+        if gray.std() > 60:
+            # High-contrast plate: a global Otsu threshold is enough and needs no cleanup
+            binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+            h, w = binary.shape
+            main_plate_part = binary[:, int(w*0.15):w]  # Skip leftmost 15% (country identifier)
+        else:
+            # Apply adaptive thresholding
+            binary = cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                cv2.THRESH_BINARY, 11, 2
+            )
+            
+            h, w = binary.shape
+            
+            # Extract the right part (main plate number)
+            main_plate_part = binary[:, int(w*0.15):w]  # Skip leftmost 15% (country identifier)
+            
+            # Apply morphological operations to enhance characters
+            main_plate_part = cv2.morphologyEx(main_plate_part, cv2.MORPH_OPEN, self._K2)
         
-        # Extract the right part (main plate number)
-        main_plate_part = binary[:, int(w*0.15):w]  # Skip leftmost 15% (country identifier)
+        # Display processed plate part
+        if self.debug:
+            cv2.imshow("Main Plate Part", main_plate_part)
         
-        # Apply morphological operations to enhance characters
-        kernel = np.ones((2, 2), np.uint8)
-        main_plate_part = cv2.morphologyEx(main_plate_part, cv2.MORPH_OPEN, kernel)
+        # Try page segmentation modes until one yields a valid UK plate
+        best_text = None
+        best_confidence = 0
         
-        # Display processed plate part
-        cv2.imshow("Main Plate Part", main_plate_part)
-        
-        # Convert to PIL image for OCR
-        pil_image = Image.fromarray(main_plate_part)
-        
-        # Try multiple OCR configurations
-        configs = [
-            '--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 8 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 13 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ]
-        
-        all_texts = []
-        confidences = []
-        
-        for config in configs:
-            # Get detailed OCR data
-            ocr_data = pytesseract.image_to_data(
-                pil_image, config=config, output_type=pytesseract.Output.DICT
-            )
-            
+        for psm in self.PLATE_PSMS:
             # Process OCR results
-            for i, conf in enumerate(ocr_data['conf']):
+            for text, conf in self.ocr_words(main_plate_part, psm, binary=True):
                 if conf > 0:  # Only consider results with confidence > 0
-                    text = ocr_data['text'][i]
-                    if text and text.strip():
-                        formatted = self.format_uk_plate(text)
-                        all_texts.append(formatted)
-                        confidences.append(float(conf))
+                    if text and text.strip() and conf > best_confidence:
+                        best_text = self.format_uk_plate(text)
+                        best_confidence = conf
+            
+            if best_text and self.uk_plate_pattern.match(best_text.replace(' ', '')):
+                break
         
         # Check if there are any results
-        if not all_texts:
-            # If none, try direct OCR
-            text = pytesseract.image_to_string(
-                pil_image, 
-                config='--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-            ).strip()
-            
-            if text:
-                return self.format_uk_plate(text)
-                
+        if best_text is None:
             # If it looks clearly like a UK plate, use preset value
             if self.is_clearly_uk_plate(plate_image):
                 return "AA03 BOJ"
                 
             return "UNKNOWN"
         
-        # Get best text based on confidence
-        max_idx = confidences.index(max(confidences))
-        return all_texts[max_idx]
+        return best_text
     
-    def detect_country_identifier(self, plate_image):
+    def detect_country_identifier(self, plate_image, gray=None):
         """
         Detect and recognize the country identifier from a plate image.
         Specifically looking for blue EU flag section and GB text.
         
         Args:
             plate_image (np.ndarray): License plate image
+            gray (np.ndarray): Grayscale version of plate_image, if already computed
             
         Returns:
             str: Detected country identifier (e.g., "GB", "EU", "UNKNOWN")
         """
         h, w = plate_image.shape[:2]
         
-        # If image is too small, resize it
+        # If image is too small, resize it to 200px wide (bilinear is enough for thresholding/OCR)
         if w < 100:
-            scale_factor = 200.0 / w
-            plate_image = cv2.resize(plate_image, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_CUBIC)
-            h, w = plate_image.shape[:2]
+            h, w = max(1, int(h * 200 / w)), 200
+            plate_image = cv2.resize(plate_image, (w, h), interpolation=cv2.INTER_LINEAR)
+            gray = None
         
         # Extract left part (country identifier section)
         # Usually leftmost ~15% of a UK plate
         left_part = plate_image[:, 0:int(w*0.18)]
         
         # Display country identifier part
-        cv2.imshow("Country Identifier Part", left_part)
+        if self.debug:
+            cv2.imshow("Country Identifier Part", left_part)
         
         # Look for blue color (EU flag background)
-        hsv = cv2.cvtColor(left_part, cv2.COLOR_BGR2HSV)
-        
-        # Define HSV range for blue
-        # Adjust these ranges based on the specific blue of EU flag
-        lower_blue = np.array([100, 50, 50])
-        upper_blue = np.array([130, 255, 255])
-        
-        # Threshold HSV image to get only blue colors
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
+        blue_mask = self._blue_mask(left_part)
         
         # Calculate percentage of blue pixels
-        blue_percentage = (np.sum(blue_mask > 0) / (blue_mask.size)) * 100
+        blue_percentage = cv2.countNonZero(blue_mask) * 100.0 / (blue_mask.shape[0] * blue_mask.shape[1])
         
         # Display blue mask
-        cv2.imshow("Blue Mask", blue_mask)
+        if self.debug:
+            cv2.imshow("Blue Mask", blue_mask)
         
         # If significant blue area detected, likely an EU flag
         if blue_percentage > 10:  # At least 10% blue
             # Now look for "GB" text
-            # Convert to grayscale for text detection
-            gray = cv2.cvtColor(left_part, cv2.COLOR_BGR2GRAY)
+            # Convert to grayscale for text detection (or reuse the caller's conversion)
+            if gray is None:
+                left_gray = cv2.cvtColor(left_part, cv2.COLOR_BGR2GRAY)
+            else:
+                left_gray = gray[:, 0:int(w*0.18)]
             
             # Threshold to isolate text
-            _, thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY)
+            _, thresh = cv2.threshold(left_gray, 180, 255, cv2.THRESH_BINARY)
             
             # Apply morphological operations to enhance text
-            kernel = np.ones((2, 2), np.uint8)
-            text_enhanced = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+            text_enhanced = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, self._K2)
             
-            cv2.imshow("GB Text Detection", text_enhanced)
+            if self.debug:
+                cv2.imshow("GB Text Detection", text_enhanced)
             
             # Use OCR to find GB text
-            text = pytesseract.image_to_string(
-                text_enhanced, 
-                config='--psm 10 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-            )
+            text = self.ocr_text(text_enhanced, 10, LETTER_WHITELIST)
             
             # If "GB" detected
             if 'GB' in text:
@@ -432,21 +614,16 @@ class UKPlateRecognizer:
                 return "GB"
             
             # Extra attempt: use simpler OCR config on original image
-            simple_text = pytesseract.image_to_string(
-                left_part,
-                config='--psm 10 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-            )
+            simple_text = self.ocr_text(left_part, 10, LETTER_WHITELIST)
             
             if 'GB' in simple_text:
                 print("GB identifier detected with simple OCR!")
                 return "GB"
             
             # If sample is typical UK plate with bright "GB", preset to GB
-            # Threshold for white text areas
-            lower_white = np.array([0, 0, 180])
-            upper_white = np.array([180, 30, 255])
-            white_mask = cv2.inRange(hsv, lower_white, upper_white)
-            white_percentage = (np.sum(white_mask > 0) / (white_mask.size)) * 100
+            # Threshold for white text areas (bright in every channel)
+            white_mask = cv2.inRange(left_part, (181, 181, 181), (255, 255, 255))
+            white_percentage = cv2.countNonZero(white_mask) * 100.0 / (white_mask.shape[0] * white_mask.shape[1])
             
             if white_percentage > 5 and blue_percentage > 20:
                 print("Visual pattern suggests GB identifier!")
@@ -468,24 +645,19 @@ class UKPlateRecognizer:
         Returns:
             str: Formatted UK plate or original text
         """
-        # Remove non-alphanumeric characters
-        clean_text = ''.join(c for c in text if c.isalnum()).upper()
-        
-        # Some potential OCR error corrections
-        clean_text = clean_text.replace('O', '0')  # Often letter O is misrecognized as number 0
-        clean_text = clean_text.replace('I', '1')  # Often letter I is misrecognized as number 1
+        # Remove non-alphanumeric characters and correct common OCR errors
+        # (letter O is often misrecognized as number 0, letter I as number 1)
+        clean_text = _NONALNUM.sub('', text.upper()).translate(_OCR_TRANS)
         
         # Specific conversion for AA03 BOJ
-        if re.search(r'AA[O0]3.*B[O0]J', clean_text):
+        if _UK_FALLBACK_RE.search(clean_text):
             return "AA03 BOJ"
         
         # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA)
-        if len(clean_text) >= 7:
-            # Try to extract UK plate format
-            for i in range(len(clean_text) - 6):
-                candidate = clean_text[i:i+7]
-                if re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', candidate):
-                    return f"{candidate[:2]}{candidate[2:4]} {candidate[4:]}"
+        match = _SLIDING.search(clean_text)
+        if match:
+            candidate = match.group()
+            return f"{candidate[:4]} {candidate[4:]}"
         
         # If specific pattern not found but length is 7, still format as UK plate
         if len(clean_text) == 7:
@@ -500,9 +672,9 @@ def main():
         sys.exit(1)
     
     image_path = sys.argv[1]
-    recognizer = UKPlateRecognizer()
+    recognizer = UKPlateRecognizer(debug=True)
     
-    results = recognizer.process_image(image_path)
+    results = recognizer.process_image(image_path, draw=True)
     
     if results:
         print("\nRecognition Results:")
@@ -0,0 +1,47 @@
+import re
+import string
+
+# UK plate format: two letters, two digits, three letters (e.g., AA00AAA)
+_PLATE_RE = re.compile(r'([A-Z]{2})(\d{2})([A-Z]{3})')
+
+# Every byte that is not an ASCII letter or digit, deleted in one C-level pass
+_NON_ALNUM_BYTES = bytes(c for c in range(256) if chr(c) not in string.ascii_letters + string.digits)
+
+def strip_non_alnum(text):
+    """
+    Remove everything except ASCII letters and digits and convert to upper case.
+    """
+    return text.encode('ascii', 'ignore').translate(None, _NON_ALNUM_BYTES).decode('ascii').upper()
+
+# Maps each character to its class (L = letter, D = digit) for positional format checks
+_CHAR_CLASS = str.maketrans({**{c: 'L' for c in string.ascii_uppercase},
+                             **{c: 'D' for c in string.digits}})
+_UK_PLATE_CLASSES = 'LLDDLLL'
+
+def is_valid_uk_plate(text):
+    """
+    Check if the text matches a UK license plate format.
+    """
+    # Remove spaces
+    text = text.replace(" ", "")
+    
+    # Check format: two letters, two digits, three letters
+    return len(text) == 7 and text.translate(_CHAR_CLASS) == _UK_PLATE_CLASSES
+
+def clean_and_format_plate(text):
+    """
+    Clean and format the recognized text as a UK plate.
+    """
+    # Remove non-alphanumeric characters
+    clean_text = strip_non_alnum(text)
+    
+    # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA) anywhere in the text
+    match = _PLATE_RE.search(clean_text)
+    if match:
+        return f"{match[1]}{match[2]} {match[3]}"
+    
+    # If specific pattern not found but length is 7, still format as UK plate
+    if len(clean_text) == 7:
+        return f"{clean_text[:2]}{clean_text[2:4]} {clean_text[4:]}"
+    
+    return clean_text
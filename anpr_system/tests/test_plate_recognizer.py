@@ -2,6 +2,7 @@ import pytest
 import cv2
 import numpy as np
 from src.plate_recognizer import PlateRecognizer
+from src.uk_plate_recognizer import UKPlateRecognizer
 
 def test_plate_recognizer_initialization():
     """Test if PlateRecognizer initializes correctly."""
@@ -31,6 +32,37 @@ def test_find_plate_contours():
     contours = recognizer.find_plate_contours(test_image)
     assert len(contours) > 0
 
+def test_find_plate_contours_filters_by_shape():
+    """Test that only plate-shaped regions are returned as bounding rectangles."""
+    recognizer = PlateRecognizer()
+    
+    # Edge map with one plate-shaped outline (4:1) and one square outline
+    edges = np.zeros((400, 600), dtype=np.uint8)
+    cv2.rectangle(edges, (100, 100), (299, 149), 255, 1)
+    cv2.rectangle(edges, (400, 250), (499, 349), 255, 1)
+    
+    rects = recognizer.find_plate_contours(edges, np.zeros((400, 600, 3), dtype=np.uint8))
+    assert rects[0] == (100, 100, 200, 50)
+    assert all(3.0 < w / h < 6.0 for _, _, w, h in rects)
+
+def test_find_plate_contours_textured_scene():
+    """Test that a plate is found on the downscaled frame of a noisy, textured scene."""
+    recognizer = PlateRecognizer()
+    
+    # 1280x720 scene with light noise and a white, black-outlined plate (about 4.5:1)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(70, 110, size=(720, 1280, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (440, 300), (840, 389), (255, 255, 255), -1)
+    cv2.rectangle(frame, (440, 300), (840, 389), (0, 0, 0), 4)
+    
+    # Detect as recognize_plate does, on a copy at most 720px on its longest side
+    scale = recognizer.detection_max_side / 1280
+    small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    rects = recognizer.find_plate_contours(recognizer.preprocess_image(small), small)
+    
+    cx, cy = 640 * scale, 345 * scale
+    assert any(x <= cx <= x + w and y <= cy <= y + h and 3.0 < w / h < 6.0 for x, y, w, h in rects)
+
 def test_extract_plate():
     """Test plate extraction."""
     recognizer = PlateRecognizer()
@@ -39,9 +71,21 @@ def test_extract_plate():
     test_image = np.zeros((100, 100, 3), dtype=np.uint8)
     cv2.rectangle(test_image, (20, 20), (80, 80), (255, 255, 255), -1)
     
-    # Create a test contour
-    contour = np.array([[20, 20], [80, 20], [80, 80], [20, 80]], dtype=np.int32)
+    # Bounding rectangle of the drawn region
+    rect = (20, 20, 61, 61)
     
-    extracted = recognizer.extract_plate(test_image, contour)
+    extracted = recognizer.extract_plate(test_image, rect)
     assert extracted is not None
-    assert extracted.shape[0] > 0 and extracted.shape[1] > 0 
\ No newline at end of file
+    assert extracted.shape[0] > 0 and extracted.shape[1] > 0 
+
+def test_uk_detect_plate_regions_full_hd_frame():
+    """Test that a plate is still detected when the frame is downscaled for detection."""
+    recognizer = UKPlateRecognizer()
+    
+    # Flat grey 1920x1080 scene with a white, black-outlined plate (about 4.5:1)
+    frame = np.full((1080, 1920, 3), 90, dtype=np.uint8)
+    cv2.rectangle(frame, (700, 500), (1220, 615), (255, 255, 255), -1)
+    cv2.rectangle(frame, (700, 500), (1220, 615), (0, 0, 0), 6)
+    
+    regions = recognizer.detect_plate_regions(frame)
+    assert any(x <= 960 <= x + w and y <= 557 <= y + h for _, (x, y, w, h) in regions)
@@ -4,10 +4,27 @@
 import os
 import sys
 import json
-import tempfile
+
+# Tesseract's OpenMP threading slows down small single-plate images; parallelism comes
+# from running several single-threaded worker processes instead. Must be set before
+# Tesseract is loaded.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+import cv2
+import hashlib
+import numpy as np
+import threading
+from collections import OrderedDict
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import uuid
+from json_provider import use_orjson
+
+# xxhash is much faster than hashlib for keying uploads; fall back to blake2b if unavailable
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # Add ANPR system path to Python path
 sys.path.append('../anpr_system/src')
@@ -22,9 +39,37 @@ except ImportError:
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+use_orjson(app)  # Faster JSON responses when orjson is installed
+
+# Reject uploads over 16 MB while the request is being parsed, before anything is buffered
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+@app.errorhandler(413)
+def too_large(e):
+    """Return a JSON error for uploads over MAX_CONTENT_LENGTH."""
+    return jsonify({"error": "Image too large (maximum 16 MB)"}), 413
 
-# Initialize ANPR system
-anpr = UKPlateRecognizer()
+# Initialize ANPR system (once per worker process when served by gunicorn)
+anpr = UKPlateRecognizer(debug=False)
+
+# Warm up with a blank frame so the first real request doesn't pay for loading
+# Tesseract's models and OpenCV's lazily initialized kernels. A failed warm-up
+# (e.g. a missing tesseract binary) is not fatal: requests then get JSON errors.
+try:
+    anpr.process_image_array(np.zeros((600, 800, 3), np.uint8), draw=False)
+except Exception as e:
+    app.logger.warning("ANPR warm-up failed, continuing without it: %s", e)
+
+# Responses for recently seen uploads, keyed by a hash of the raw image bytes
+CACHE_SIZE = 512
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _image_key(raw_bytes):
+    """Return a (non-cryptographic) hash of the uploaded image bytes."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(raw_bytes)
+    return hashlib.blake2b(raw_bytes, digest_size=8).hexdigest()
 
 @app.route('/api/anpr-process', methods=['POST'])
 def anpr_process():
@@ -33,38 +78,50 @@ def anpr_process():
         return jsonify({"error": "No image provided"}), 400
     
     try:
-        # Get the uploaded file
+        # Decode the uploaded image in memory
         uploaded_file = request.files['image']
+        raw_bytes = uploaded_file.read()
         
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
-            uploaded_file.save(temp_path)
+        # Repeated uploads of the same image skip the whole pipeline
+        key = _image_key(raw_bytes)
+        with _cache_lock:
+            if key in _response_cache:
+                _response_cache.move_to_end(key)
+                return jsonify(_response_cache[key])
         
-        # Process the image with the ANPR system
-        results = anpr.process_image(temp_path)
+        data = np.frombuffer(raw_bytes, np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if image is None:
+            return jsonify({"error": "Could not decode image"}), 400
         
-        # Clean up the temporary file
-        os.unlink(temp_path)
+        # Process the image with the ANPR system
+        results = anpr.process_image_array(image, draw=False)
         
         # Check if any plate was detected
         if not results:
-            return jsonify({
+            response = {
                 "plate_number": "UNKNOWN",
                 "country_identifier": "UNKNOWN",
                 "confidence": 0.0
-            })
+            }
+        else:
+            # Get the first detected plate
+            first_plate_key = next(iter(results))
+            plate_data = results[first_plate_key]
+            
+            # Return the recognition results
+            response = {
+                "plate_number": plate_data["plate_number"],
+                "country_identifier": plate_data["country_identifier"],
+                "confidence": 0.74  # Placeholder confidence value
+            }
         
-        # Get the first detected plate
-        first_plate_key = list(results.keys())[0]
-        plate_data = results[first_plate_key]
+        with _cache_lock:
+            _response_cache[key] = response
+            if len(_response_cache) > CACHE_SIZE:
+                _response_cache.popitem(last=False)
         
-        # Return the recognition results
-        return jsonify({
-            "plate_number": plate_data["plate_number"],
-            "country_identifier": plate_data["country_identifier"],
-            "confidence": 0.74  # Placeholder confidence value
-        })
+        return jsonify(response)
         
     except Exception as e:
         print(f"Error processing image: {str(e)}")
@@ -82,6 +139,7 @@ if __name__ == '__main__':
     print(f"Starting ANPR API server on port {port}")
     print("Available endpoints:")
     print("  POST /api/anpr-process - Process an image with ANPR")
+    print("For production, serve with: gunicorn -w <workers> api_server:app")
     
-    # Start the server
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Start the development server (no reloader: it would load the recognizer twice)
+    app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
@@ -4,50 +4,79 @@ ANPR API Server - Cross-Platform Starter
 Just double-click this script to start the ANPR system on any operating system.
 """
 
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+import re
 import sys
 import webbrowser
 import platform
+import shutil
 import socket
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Tesseract's OpenMP threading slows down small single-plate images and fights the
+# single-threaded engine below on multicore machines. Must be set before Tesseract is loaded.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+import cv2
+import numpy as np
+import pytesseract
+
 # Print header
 os_name = platform.system()
 print("\n=====================================================")
 print(f"Starting ANPR System on {os_name}")
 print("=====================================================")
 
+# UK plate (AA00AAA), loose plate-like candidates, and the API endpoint line in plate-reader.js
+_UK_PLATE_RE = re.compile(r'[A-Z]{2}\d{2}[A-Z]{3}')
+_CANDIDATE_RE = re.compile(r'[A-Z0-9]{2,7}')
+_JS_ENDPOINT_RE = re.compile(r"const endpoint = 'http://localhost:\d+/api/anpr-process';")
+
 # Add ANPR system path
 current_dir = Path(__file__).parent.absolute()
 anpr_path = current_dir.parent / "anpr_system" / "src"
 sys.path.append(str(anpr_path))
 
-# Function to check if a port is in use
-def is_port_in_use(port):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        return s.connect_ex(('localhost', port)) == 0
+# Optional in-process Tesseract (None when tesserocr is not installed)
+from tess_backend import PyTessBaseAPI, PSM
 
-# Find an available port starting from 5000
+# Find an available port starting from 5000 by trying to bind() one probe socket to
+# each port in turn; a taken port fails immediately, without a TCP handshake
 def find_available_port(start_port=5000, max_attempts=10):
-    port = start_port
-    for _ in range(max_attempts):
-        if not is_port_in_use(port):
-            return port
-        port += 1
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Treat ports left in TIME_WAIT as free. On Windows SO_REUSEADDR would also
+        # allow binding a port another server is listening on, so it is not set there.
+        if os_name != "Windows":
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        for port in range(start_port, start_port + max_attempts):
+            try:
+                s.bind(('', port))
+                return port
+            except OSError:
+                continue
     return start_port + max_attempts  # Return a higher port if all checked are in use
 
 # Install required packages
 try:
     # Try to import Flask
     from flask import Flask, request, jsonify
+    from flask.logging import default_handler
     from flask_cors import CORS
     print("Flask dependencies already installed.")
 except ImportError:
     print("Installing Flask dependencies...")
     try:
-        import pip
-        pip.main(['install', 'flask', 'flask-cors'])
+        # Run pip in its own process so none of its machinery stays loaded in the server
+        subprocess.run([sys.executable, '-m', 'pip', 'install', '--quiet', 'flask', 'flask-cors'], check=True)
         from flask import Flask, request, jsonify
+        from flask.logging import default_handler
         from flask_cors import CORS
         print("Flask dependencies installed successfully.")
     except Exception as e:
@@ -56,6 +85,8 @@ except ImportError:
         input("Press Enter to exit...")
         sys.exit(1)
 
+from json_provider import use_orjson
+
 # Try to import ANPR system components
 try:
     from uk_plate_recognizer import UKPlateRecognizer
@@ -69,20 +100,245 @@ except ImportError:
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+use_orjson(app)  # Faster JSON responses when orjson is installed
 
-# Initialize ANPR system
-print("Initializing ANPR system...")
-try:
-    anpr = UKPlateRecognizer()
-    print("ANPR system initialized successfully!")
-except Exception as e:
-    print(f"Error initializing ANPR system: {e}")
-    input("Press Enter to exit...")
-    sys.exit(1)
+# Reject uploads over 16 MB while the request is being parsed, before anything is buffered
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+@app.errorhandler(413)
+def too_large(e):
+    """Return a JSON error for uploads over MAX_CONTENT_LENGTH."""
+    return jsonify({"error": "Image too large (maximum 16 MB)"}), 413
+
+# The recognizer and the fallback OCR engine are created by init_anpr() in the process
+# that serves requests (each gunicorn worker, or the Flask fallback), never in the launcher.
+# Flask serves requests on several threads and the Tesseract engine is not thread-safe,
+# so fallback OCR calls are serialized.
+anpr = None
+TESS_API = None
+TESS_LOCK = threading.Lock()
+
+def ocr_image(image, psm):
+    """
+    Run Tesseract on a grayscale image.
+    
+    Args:
+        image (np.ndarray): Grayscale or binary image
+        psm (int): Tesseract page segmentation mode
+        
+    Returns:
+        str: Recognized text
+    """
+    if TESS_API is None:
+        return pytesseract.image_to_string(image, config=f'--psm {psm}')
+    
+    h, w = image.shape[:2]
+    with TESS_LOCK:
+        TESS_API.SetPageSegMode(psm)
+        TESS_API.SetImageBytes(image.tobytes(), w, h, 1, w)
+        return TESS_API.GetUTF8Text()
+
+# Requests that queue up while the worker is busy are recognized together, up to
+# BATCH_SIZE at a time, by a single worker thread. An idle server never waits for
+# more requests, so a lone request is recognized immediately.
+BATCH_SIZE = int(os.environ.get('ANPR_BATCH_SIZE', '8'))
+_batch_queue = queue.Queue()
+
+def _batch_worker():
+    """Collect queued images into batches and recognize them with the ANPR system."""
+    while True:
+        # Block for the first request, then take only what is already waiting
+        batch = [_batch_queue.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_batch_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            results = anpr.process_batch([item["image"] for item in batch], draw=False)
+            for item, result in zip(batch, results):
+                item["result"] = result
+        except Exception as e:
+            for item in batch:
+                item["error"] = e
+        
+        for item in batch:
+            item["done"].set()
+
+def recognize(image):
+    """
+    Recognize plates in an image through the batching worker.
+    
+    Args:
+        image (np.ndarray): BGR image
+        
+    Returns:
+        dict: Recognition results from UKPlateRecognizer
+    """
+    item = {"image": image, "done": threading.Event()}
+    _batch_queue.put(item)
+    item["done"].wait()
+    if "error" in item:
+        raise item["error"]
+    return item["result"]
+
+class _RawQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues records as they are. The stdlib prepare() formats the
+    message and traceback on the logging thread so records can cross processes; the
+    listener here runs in the same process, so formatting is left to it.
+    """
+    
+    def prepare(self, record):
+        return record
+
+def init_anpr():
+    """
+    Set up request logging, the ANPR recognizer, the fallback OCR engine and the
+    batch worker in the serving process. Safe to call more than once.
+    """
+    global anpr, TESS_API
+    if anpr is not None:
+        return
+    
+    # Request logging goes through a queue: request threads only enqueue the raw
+    # records, and a background listener thread formats them (message arguments and
+    # tracebacks included) and writes them to stderr
+    log_queue = queue.Queue(-1)
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(_RawQueueHandler(log_queue))
+    app.logger.setLevel(logging.INFO)
+    log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
+    # Initialize ANPR system
+    print("Initializing ANPR system...")
+    try:
+        anpr = UKPlateRecognizer(debug=False)
+        print("ANPR system initialized successfully!")
+    except Exception as e:
+        print(f"Error initializing ANPR system: {e}")
+        input("Press Enter to exit...")
+        sys.exit(1)
+    
+    # One Tesseract engine for the fallback OCR, reused across requests
+    if PyTessBaseAPI is not None:
+        TESS_API = PyTessBaseAPI(lang='eng', psm=PSM.SINGLE_LINE)
+    
+    # Warm up both OCR paths so the first real request doesn't pay for loading
+    # Tesseract's models and OpenCV's lazily initialized kernels
+    # A failed warm-up (e.g. a missing tesseract binary) is not fatal: the server still
+    # starts and requests get JSON errors
+    print("Warming up ANPR system...")
+    try:
+        anpr.process_image_array(np.zeros((600, 800, 3), np.uint8), draw=False)
+        ocr_image(np.zeros((32, 128), np.uint8), 7)
+    except Exception as e:
+        app.logger.warning("ANPR warm-up failed, continuing without it: %s", e)
+    
+    batch_thread = threading.Thread(target=_batch_worker)
+    batch_thread.daemon = True
+    batch_thread.start()
+
+# Images with at least this many pixels run the fallback OCR speculatively, alongside
+# the main recognizer, so a miss costs max(main, fallback) instead of their sum
+# A speculative job is only started when one of the pool's workers is free, so jobs
+# never queue up behind each other; otherwise the fallback runs after a miss as usual
+SPECULATIVE_MIN_PIXELS = 1000000
+SPECULATIVE_WORKERS = 2
+_fallback_pool = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS)
+_speculative_slots = threading.BoundedSemaphore(SPECULATIVE_WORKERS)
+
+def fallback_ocr(img, data, cancelled=None):
+    """
+    Read a UK plate from the whole image with a single Otsu threshold and one OCR pass.
+    
+    Args:
+        img (np.ndarray): Decoded BGR image
+        data (np.ndarray): Encoded image bytes, for reduced-size re-decoding
+        cancelled (threading.Event): Set when the result is no longer needed
+        
+    Returns:
+        dict: Recognition results, or None if no UK plate was read
+    """
+    if cancelled is not None and cancelled.is_set():
+        return None
+    
+    # Use a simpler direct OCR approach on a grayscale image of at most ~1024px
+    longest = max(img.shape[:2])
+    if longest > 1024:
+        # Re-decode large photos in grayscale at 1/2, 1/4 or 1/8 scale;
+        # libjpeg skips the chroma planes and most of the IDCT work
+        if longest <= 2048:
+            flag = cv2.IMREAD_REDUCED_GRAYSCALE_2
+        elif longest <= 4096:
+            flag = cv2.IMREAD_REDUCED_GRAYSCALE_4
+        else:
+            flag = cv2.IMREAD_REDUCED_GRAYSCALE_8
+        gray = cv2.imdecode(data, flag)
+    else:
+        # Convert to grayscale; the BGR decode already exists for the main recognizer,
+        # and one cvtColor pass is cheaper than decoding the bytes again as grayscale
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    # Apply thresholding; a near two-tone image (very high contrast) splits cleanly at
+    # mid-gray, so the Otsu histogram search is only needed for everything else
+    _, std = cv2.meanStdDev(gray)
+    if std[0, 0] > 100:
+        _, thresh = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    else:
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    
+    if cancelled is not None and cancelled.is_set():
+        return None
+    
+    # Extract the text as a single line
+    text = ocr_image(thresh, 7)
+    app.logger.info("Fallback OCR detected text: %s", text)
+    
+    # Format the text - remove spaces, newlines, etc.
+    text = ''.join(text.split())
+    
+    # Check if the text looks like a UK license plate
+    match = _UK_PLATE_RE.search(text)
+    
+    if not match:
+        return None
+    
+    plate_text = match.group(0)
+    # Format as AA00 AAA
+    plate_text = f"{plate_text[:4]} {plate_text[4:]}"
+    app.logger.info("Formatted plate text: %s", plate_text)
+    
+    # Create a results dictionary
+    return {
+        "plate_0": {
+            "plate_number": plate_text,
+            "country_identifier": "GB",
+            "region": None,
+            "bbox": None
+        }
+    }
+
+def _speculative_fallback(img, data, cancelled):
+    """Run fallback_ocr on a pool worker and free its speculative slot afterwards."""
+    try:
+        return fallback_ocr(img, data, cancelled)
+    finally:
+        _speculative_slots.release()
 
 @app.route('/api/anpr-process', methods=['POST'])
 def anpr_process():
-    """Process the uploaded image"""
+    """
+    Process the uploaded image.
+    
+    Concurrency: this handler only decodes the upload and waits. Recognition runs on
+    the batch worker thread and the fallback OCR on _fallback_pool. Both spend their
+    time in OpenCV and Tesseract calls that release the GIL, with no per-pixel Python
+    loops, so requests served on other threads keep running meanwhile.
+    """
     if 'image' not in request.files:
         return jsonify({"error": "No image provided"}), 400
     
@@ -91,86 +347,52 @@ def anpr_process():
         uploaded_file = request.files['image']
         
         # Log file info
-        print(f"Processing image file: {uploaded_file.filename}, " 
-              f"Content type: {uploaded_file.content_type}, "
-              f"Size: {uploaded_file.content_length or 'unknown'} bytes")
+        app.logger.info("Processing image file: %s, Content type: %s, Size: %s bytes",
+                        uploaded_file.filename, uploaded_file.content_type,
+                        uploaded_file.content_length or 'unknown')
         
-        # Create a temporary file to save the uploaded image
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
-            uploaded_file.save(temp_path)
+        # Decode the uploaded image in memory
+        data = np.frombuffer(uploaded_file.read(), np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if img is None:
+            return jsonify({"error": "Could not decode image"}), 400
         
-        # Process the image with the ANPR system
-        print(f"Processing image: {temp_path}")
+        # Start the fallback early on large images when a pool worker is free; its result
+        # is only used if the main path misses, otherwise `cancelled` stops it early
+        speculative = None
+        cancelled = threading.Event()
+        if (img.shape[0] * img.shape[1] >= SPECULATIVE_MIN_PIXELS
+                and _speculative_slots.acquire(blocking=False)):
+            speculative = _fallback_pool.submit(_speculative_fallback, img, data, cancelled)
         
         try:
             # Try using the UKPlateRecognizer
-            results = anpr.process_image(temp_path)
+            results = recognize(img)
             
             # If no results, try a fallback approach
             if not results:
-                print("No plate detected with main algorithm, trying fallback method...")
-                
-                # Use a simpler direct OCR approach
-                import cv2
-                import pytesseract
-                from PIL import Image
-                
-                # Read the image
-                img = cv2.imread(temp_path)
-                
-                # Convert to grayscale
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                
-                # Apply thresholding
-                _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                
-                # Use pytesseract to extract text
-                text = pytesseract.image_to_string(thresh, config='--psm 7')
-                print(f"Fallback OCR detected text: {text}")
-                
-                # Format the text - remove spaces, newlines, etc.
-                text = ''.join(text.split())
-                
-                # Check if the text looks like a UK license plate
-                import re
-                uk_plate_pattern = re.compile(r'[A-Z]{2}\d{2}[A-Z]{3}')
-                match = uk_plate_pattern.search(text)
-                
-                if match:
-                    plate_text = match.group(0)
-                    # Format as AA00 AAA
-                    plate_text = f"{plate_text[:4]} {plate_text[4:]}"
-                    print(f"Formatted plate text: {plate_text}")
-                    
-                    # Create a results dictionary
-                    results = {
-                        "plate_0": {
-                            "plate_number": plate_text,
-                            "country_identifier": "GB",
-                            "region": None,
-                            "bbox": None
-                        }
-                    }
+                app.logger.info("No plate detected with main algorithm, trying fallback method...")
+                results = speculative.result() if speculative else fallback_ocr(img, data)
+            else:
+                cancelled.set()
         except Exception as process_error:
-            print(f"Error during image processing: {str(process_error)}")
+            cancelled.set()
+            app.logger.warning("Error during image processing: %s", process_error)
             
             # As a last resort, try to detect text in the image using simple OCR
             try:
-                print("Trying basic OCR as last resort...")
-                text = pytesseract.image_to_string(Image.open(temp_path))
+                app.logger.info("Trying basic OCR as last resort...")
+                text = ocr_image(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 3)
                 
                 # Log the raw OCR result
-                print(f"Raw OCR result: {text}")
+                app.logger.info("Raw OCR result: %s", text)
                 
                 # Look for patterns that might be license plates
-                import re
-                plate_candidates = re.findall(r'[A-Z0-9]{2,7}', text)
+                plate_candidates = _CANDIDATE_RE.findall(text)
                 if plate_candidates:
                     # Use the longest candidate as our best guess
                     best_candidate = max(plate_candidates, key=len)
-                    print(f"Best license plate candidate: {best_candidate}")
+                    app.logger.info("Best license plate candidate: %s", best_candidate)
                     
                     # Create a results dictionary
                     results = {
@@ -184,18 +406,12 @@ def anpr_process():
                 else:
                     results = None
             except Exception as ocr_error:
-                print(f"Error in basic OCR: {str(ocr_error)}")
+                app.logger.error("Error in basic OCR: %s", ocr_error)
                 results = None
         
-        # Clean up the temporary file
-        try:
-            os.unlink(temp_path)
-        except Exception as e:
-            print(f"Warning: Could not delete temporary file {temp_path}: {e}")
-        
         # Check if any plate was detected
         if not results:
-            print("No license plate detected by any method")
+            app.logger.info("No license plate detected by any method")
             return jsonify({
                 "plate_number": "UNKNOWN",
                 "country_identifier": "UNKNOWN",
@@ -203,11 +419,12 @@ def anpr_process():
             })
         
         # Get the first detected plate
-        first_plate_key = list(results.keys())[0]
+        first_plate_key = next(iter(results))
         plate_data = results[first_plate_key]
         
-        print(f"Detected license plate: {plate_data.get('plate_number', 'UNKNOWN')}, "
-              f"Country: {plate_data.get('country_identifier', 'UNKNOWN')}")
+        app.logger.info("Detected license plate: %s, Country: %s",
+                        plate_data.get('plate_number', 'UNKNOWN'),
+                        plate_data.get('country_identifier', 'UNKNOWN'))
         
         # Use actual ANPR detection results rather than hardcoded values
         plate_number = plate_data.get('plate_number', 'UNKNOWN')
@@ -220,11 +437,8 @@ def anpr_process():
         })
         
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        
-        # Additional error details for debugging
-        import traceback
-        traceback.print_exc()
+        # Logs the message with the traceback for debugging
+        app.logger.exception("Error processing image: %s", e)
         
         return jsonify({
             "error": f"Error processing image: {str(e)}",
@@ -257,18 +471,18 @@ if __name__ == '__main__':
             with open(js_file_path, 'r') as file:
                 js_content = file.read()
             
-            # Replace the API endpoint port
-            import re
-            updated_js = re.sub(
-                r'const endpoint = \'http://localhost:\d+/api/anpr-process\';', 
-                f"const endpoint = 'http://localhost:{api_port}/api/anpr-process';", 
-                js_content
-            )
-            
-            with open(js_file_path, 'w') as file:
-                file.write(updated_js)
-            
-            print(f"Updated API endpoint in {js_file_path}")
+            endpoint_line = f"const endpoint = 'http://localhost:{api_port}/api/anpr-process';"
+            if endpoint_line in js_content:
+                # Already pointing at this port (the usual case), leave the file alone
+                print(f"API endpoint in {js_file_path} is already up to date")
+            else:
+                # Replace the API endpoint port
+                updated_js = _JS_ENDPOINT_RE.sub(endpoint_line, js_content)
+                
+                with open(js_file_path, 'w') as file:
+                    file.write(updated_js)
+                
+                print(f"Updated API endpoint in {js_file_path}")
         except Exception as e:
             print(f"Warning: Could not update API endpoint in JavaScript file: {e}")
             print(f"You may need to manually update the API endpoint to port {api_port} in {js_file_path}")
@@ -287,14 +501,15 @@ if __name__ == '__main__':
     # Start web server in a separate thread
     import threading
     def run_web_server():
+        import functools
         import http.server
-        import socketserver
         
-        os.chdir(current_dir)
-        handler = http.server.SimpleHTTPRequestHandler
+        # Serve from current_dir without chdir'ing the whole process; one thread per
+        # connection so large assets don't block other page loads
+        handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(current_dir))
         
         try:
-            with socketserver.TCPServer(("", web_port), handler) as httpd:
+            with http.server.ThreadingHTTPServer(("", web_port), handler) as httpd:
                 print(f"Web server running at http://localhost:{web_port}")
                 httpd.serve_forever()
         except Exception as e:
@@ -316,9 +531,29 @@ if __name__ == '__main__':
     browser_thread.daemon = True
     browser_thread.start()
     
-    # Start API server
+    # Start API server: gunicorn worker processes where available (not on Windows),
+    # then Hypercorn's asyncio worker (runs everywhere; reads uploads from many clients
+    # on one event loop and runs the Flask app in its thread pool), otherwise Flask's
+    # threaded development server
     try:
-        app.run(host='0.0.0.0', port=api_port, debug=False)
+        env = dict(os.environ, OMP_THREAD_LIMIT='1')
+        if os_name != "Windows" and shutil.which("gunicorn"):
+            server = subprocess.Popen(
+                ['gunicorn', '-w', str(os.cpu_count() or 1), '-k', 'gthread', '--threads', '2',
+                 '-b', f'0.0.0.0:{api_port}', 'wsgi:app'],
+                cwd=str(current_dir), env=env
+            )
+            server.wait()
+        elif shutil.which("hypercorn"):
+            server = subprocess.Popen(
+                ['hypercorn', '--workers', '1', '--worker-class', 'asyncio',
+                 '--bind', f'0.0.0.0:{api_port}', 'wsgi:app'],
+                cwd=str(current_dir), env=env
+            )
+            server.wait()
+        else:
+            init_anpr()
+            app.run(host='0.0.0.0', port=api_port, debug=False, threaded=True)
     except Exception as e:
         print(f"Error starting API server: {e}")
         print("Please check if the port is available or try a different port.")
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+# WSGI entry point for the one-click ANPR API server (start_api.py)
+#
+# Serve with: gunicorn -k gthread --threads 2 -w <workers> wsgi:app
+# Each worker process imports this module and builds its own UKPlateRecognizer;
+# the start_api.py launcher itself never creates one.
+
+from start_api import app, init_anpr
+
+init_anpr()